@@ -1,11 +1,9 @@
 import streamlit as st
-import pandas as pd
-import requests
 import folium
 from streamlit_folium import st_folium
 from datetime import datetime
-import os
-from geopy.distance import geodesic
+from water_data import PARAMS, append_submission, compact, delete_row, ensure_data_file, read_data, summarize
+from zipcode_table import nearest_known
 
 # Set page configuration
 st.set_page_config(page_title="San Jose Water Quality Dashboard", layout="centered")
@@ -23,24 +21,13 @@ st.markdown("""
 # Title
 st.title("San Jose Water Quality Dashboard")
 
-# Known coordinates for San Jose zip codes as fallback
-known_zipcode_coords = {
-    "95110": (37.3422, -121.8996),
-    "95112": (37.3535, -121.8865),
-    "95113": (37.3333, -121.8907),
-    "95116": (37.3496, -121.8569),
-    "95117": (37.3126, -121.9502),
-    "95118": (37.2505, -121.8891),
-    "95120": (37.2060, -121.8133),
-}
-
-# Define path and expected columns for data file
-file_path = "san_jose_water_quality_user_data.csv"
-expected_columns = ["Zipcode", "Date", "pH", "Turbidity", "Dissolved Oxygen", "Nitrate"]
+# Create the data file if not present
+ensure_data_file()
 
-# Load existing data or create a new file if not present
-if not os.path.isfile(file_path):
-    pd.DataFrame(columns=expected_columns).to_csv(file_path, index=False)
+# Deleted entries are hidden immediately; compaction removes them from the data file
+if st.sidebar.button("Compact"):
+    compact()
+    st.sidebar.success("Data file compacted.")
 
 # Utility functions
 def validate_data(pH, turbidity, dissolved_oxygen, nitrate):
@@ -55,32 +42,61 @@ def validate_data(pH, turbidity, dissolved_oxygen, nitrate):
         validation_warnings.append("Nitrate level is outside the safe range (0 - 10 mg/L).")
     return validation_warnings
 
-def get_nearest_zipcode(lat, lon):
-    min_distance = float("inf")
-    nearest_zipcode = None
-    for zipcode, coord in known_zipcode_coords.items():
-        distance = geodesic((lat, lon), coord).miles
-        if distance < min_distance:
-            min_distance = distance
-            nearest_zipcode = zipcode
-    return nearest_zipcode
+# Reuse one HTTP connection to Nominatim across clicks and reruns
+@st.cache_resource
+def get_geocoding_session():
+    # requests is only imported once a click actually needs a network lookup
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers["User-Agent"] = "sj-water-app/1.0"  # Nominatim's usage policy requires an identifying User-Agent
+    retries = Retry(total=2, backoff_factor=0.3)
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retries))
+    return session
+
+# Cache lookups on coordinates rounded to ~110m so reruns and repeat clicks skip the network
+@st.cache_data(ttl=86400, show_spinner=False)
+def reverse_geocode(lat_r, lon_r):
+    url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat_r}&lon={lon_r}&zoom=10&addressdetails=1"
+    response = get_geocoding_session().get(url, timeout=2.0)
+    response.raise_for_status()  # Failed lookups raise and are not cached
+    data = response.json()
+    if "address" in data and "postcode" in data["address"]:
+        return data["address"]["postcode"]
+    return None
+
+# Clicks farther than this from every known zipcode are treated as outside San Jose
+MAX_DISTANCE_MILES = 15
 
 def get_zipcode_from_coordinates(lat, lon):
-    url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&zoom=10&addressdetails=1"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        if "address" in data and "postcode" in data["address"]:
-            return data["address"]["postcode"]
-    return get_nearest_zipcode(lat, lon)
+    nearest_zipcode, distance = nearest_known(lat, lon)
+    if distance > MAX_DISTANCE_MILES:
+        return None  # Skip the network lookup for points clearly outside San Jose
+    from requests import RequestException
+
+    try:
+        postcode = reverse_geocode(round(lat, 3), round(lon, 3))
+    except RequestException:
+        postcode = None
+    if postcode:
+        return postcode
+    return nearest_zipcode
+
+# The selection map never changes, so it is built once and reused across reruns
+@st.cache_resource
+def build_location_map():
+    initial_location = [37.3382, -121.8863]
+    m = folium.Map(location=initial_location, zoom_start=12)
+    m.add_child(folium.LatLngPopup())
+    return m
 
 # Step 1: Location Selection
 st.markdown("### Step 1: Select Your Location")
 st.write("Click on the map to choose your location. We’ll detect the zipcode automatically.")
-initial_location = [37.3382, -121.8863]
-m = folium.Map(location=initial_location, zoom_start=12)
-m.add_child(folium.LatLngPopup())
-map_output = st_folium(m)  # Removed width and height to use default size
+# Only the clicked point is sent back, not the full map state
+map_output = st_folium(build_location_map(), returned_objects=["last_clicked"])  # Removed width and height to use default size
 clicked_coordinates = map_output.get("last_clicked", None)
 zipcode = ""
 
@@ -90,20 +106,24 @@ if clicked_coordinates:
     if zipcode:
         st.success(f"Detected Zipcode: {zipcode}")
     else:
-        st.warning("Could not find a zipcode for the selected location. Try another point.")
+        st.warning("The selected location is outside San Jose. Try another point.")
 
 zipcode = st.text_input("Confirm Zipcode", value=zipcode, max_chars=5)
 
 # Step 2: Water Quality Data Entry
+# Inputs sit in a form so editing them does not rerun the page until the data is submitted;
+# values are kept after submit so a rejected entry can be corrected instead of retyped
 st.markdown("### Step 2: Enter Water Quality Data")
-date = st.date_input("Date of Measurement", value=datetime.today())
-ph_level = st.number_input("pH Level (6.5 - 8.5)", min_value=6.5, max_value=8.5, value=7.0, step=0.1)
-turbidity = st.number_input("Turbidity (NTU, 0 - 5 ideal)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
-dissolved_oxygen = st.number_input("Dissolved Oxygen (mg/L, 5 - 14 ideal)", min_value=5.0, max_value=14.0, value=8.0, step=0.1)
-nitrate = st.number_input("Nitrate Level (mg/L, 0 - 10 safe)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
+with st.form("entry_form", clear_on_submit=False):
+    date = st.date_input("Date of Measurement", value=datetime.today())
+    ph_level = st.number_input("pH Level (6.5 - 8.5)", min_value=6.5, max_value=8.5, value=7.0, step=0.1)
+    turbidity = st.number_input("Turbidity (NTU, 0 - 5 ideal)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
+    dissolved_oxygen = st.number_input("Dissolved Oxygen (mg/L, 5 - 14 ideal)", min_value=5.0, max_value=14.0, value=8.0, step=0.1)
+    nitrate = st.number_input("Nitrate Level (mg/L, 0 - 10 safe)", min_value=0.0, max_value=10.0, value=1.0, step=0.1)
+    submitted = st.form_submit_button("Submit Data")
 
 # Submit Data
-if st.button("Submit Data"):
+if submitted:
     if zipcode:
         validation_warnings = validate_data(ph_level, turbidity, dissolved_oxygen, nitrate)
         if validation_warnings:
@@ -111,17 +131,8 @@ if st.button("Submit Data"):
             for warning in validation_warnings:
                 st.write(f"- {warning}")
         else:
-            new_data = pd.DataFrame({
-                "Zipcode": [zipcode],
-                "Date": [date],
-                "pH": [ph_level],
-                "Turbidity": [turbidity],
-                "Dissolved Oxygen": [dissolved_oxygen],
-                "Nitrate": [nitrate]
-            })
-            new_data.to_csv(file_path, mode='a', header=False, index=False)
+            append_submission(zipcode, date, ph_level, turbidity, dissolved_oxygen, nitrate)
             st.success("Thank you! Your data has been submitted successfully. ✅")
-            st.experimental_set_query_params(rerun=True)
     else:
         st.error("Please enter or confirm a valid zipcode.")
 
@@ -130,22 +141,23 @@ st.markdown("---")
 st.header("Review Recent Data Submissions")
 st.write("Below are the most recent submissions. You can review and delete entries if necessary.")
 
-if os.path.isfile(file_path):
-    recent_data = pd.read_csv(file_path, dtype={"Zipcode": str})
+# Picking an entry to delete only reruns this section, not the map and form above
+@st.fragment
+def review_recent_submissions():
+    recent_data = read_data()
     if not recent_data.empty:
-        for idx, row in recent_data.tail(5).iterrows():
-            entry_text = (f"**Zipcode:** {row['Zipcode']}, **Date:** {row['Date']}, "
-                          f"**pH:** {row['pH']}, **Turbidity:** {row['Turbidity']}, "
-                          f"**Dissolved Oxygen:** {row['Dissolved Oxygen']}, **Nitrate:** {row['Nitrate']}")
-            st.write(entry_text)
-            if st.button(f"Delete Entry {idx}", key=f"delete_{idx}"):
-                recent_data = recent_data.drop(idx)
-                recent_data.to_csv(file_path, index=False)
-                st.success("Entry deleted successfully.")
-                st.experimental_set_query_params(rerun=True)
+        latest_entries = recent_data.tail(5)
+        st.dataframe(latest_entries, width="stretch")
+        idx = st.selectbox("Delete entry index", latest_entries.index.tolist())
+        if st.button("Delete"):
+            delete_row(idx)
+            st.toast("Entry deleted successfully.")
+            st.rerun()  # Refresh the whole page so the analysis below reflects the deletion
     else:
         st.write("No data available yet.")
 
+review_recent_submissions()
+
 # Water Quality Analysis
 st.markdown("---")
 st.header("Water Quality Analysis")
@@ -158,8 +170,8 @@ safe_ranges = {
     "Nitrate": (0, 10)
 }
 
-if not recent_data.empty:
-    latest_data = recent_data.groupby("Zipcode").mean(numeric_only=True).reset_index()
+latest_data, _ = summarize(["Zipcode"] + PARAMS)
+if not latest_data.empty:
     for _, row in latest_data.iterrows():
         st.subheader(f"Zipcode: {row['Zipcode']}")
         st.write("Water quality compared to safe ranges:")
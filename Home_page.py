@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-import os
+import numpy as np
+from water_data import PARAMS, data_available, data_columns, summarize
 
 st.title("San Jose Water Quality - Learning Dashboard")
 
@@ -9,9 +9,6 @@ st.write("Water quality impacts health, the environment, and even the taste of d
          "This dashboard provides easy-to-understand insights into different water quality parameters, "
          "so you can learn why these values are important and how they affect daily life.")
 
-# File path to the data
-file_path = "san_jose_water_quality_user_data.csv"
-
 # Define explanations, icons, and tips for each parameter
 learning_info = {
     "pH": {
@@ -53,25 +50,29 @@ safe_ranges = {
 }
 
 # Load data if the file exists
-if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
-    data = pd.read_csv(file_path)
-
-    if "Zipcode" in data.columns:
-        # Convert relevant columns to numeric
-        for col in ["pH", "Turbidity", "Dissolved Oxygen", "Nitrate"]:
-            data[col] = pd.to_numeric(data[col], errors="coerce")
-
-        # Calculate average values for each parameter by Zipcode
-        latest_data = data.groupby("Zipcode").mean(numeric_only=True).reset_index()
+if data_available():
+    if "Zipcode" in data_columns():
+        # Calculate average values for each parameter by Zipcode; Date is not needed here
+        latest_data, _ = summarize(["Zipcode"] + PARAMS)
+
+        # Compare every zipcode and parameter against its safe range in one vectorized pass
+        params = list(learning_info)
+        values = latest_data[params].to_numpy(dtype=np.float32)
+        lows = np.array([safe_ranges[param][0] for param in params], dtype=np.float32)
+        highs = np.array([safe_ranges[param][1] for param in params], dtype=np.float32)
+        has_value = ~np.isnan(values)
+        in_safe_range = (values >= lows) & (values <= highs)
+        all_safe = in_safe_range.all(axis=1)
+        progress = np.minimum(values / np.maximum(highs, values), 1.0)
 
         # Display a simplified health-focused analysis
         st.header("Water Quality in Your Area")
-        for index, row in latest_data.iterrows():
-            st.subheader(f"Zipcode: {row['Zipcode']}")
+        for i, zipcode in enumerate(latest_data["Zipcode"]):
+            st.subheader(f"Zipcode: {zipcode}")
             st.write("Here’s a quick overview of water quality in your area.")
 
             # Display info and health relevance for each parameter
-            for param, info in learning_info.items():
+            for j, (param, info) in enumerate(learning_info.items()):
                 st.write(f"### {info['icon']} {param} - {info['importance']}")
                 st.write(f"**Why It Matters:** {info['health_effects']}")
                 
@@ -79,34 +80,23 @@ if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
                 st.write(f"**Ideal Range:** {info['ideal_range']}")
 
                 # Show current data for the parameter with visual indicators
-                current_value = row[param]
-                if pd.notna(current_value):
-                    # Interpret if value is within safe range
-                    in_safe_range = safe_ranges[param][0] <= current_value <= safe_ranges[param][1]
-                    status = "Safe" if in_safe_range else "Alert"
-
-                    # Display with colored badge and progress bar
-                    color = "green" if in_safe_range else "red"
-                    st.write(f"- **Current Level**: {current_value:.2f} ({status})", 
+                if has_value[i, j]:
+                    status = "Safe" if in_safe_range[i, j] else "Alert"
+                    st.write(f"- **Current Level**: {values[i, j]:.2f} ({status})", 
                              unsafe_allow_html=True)
 
                     # Progress bar to visualize parameter relative to safe range
-                    safe_min, safe_max = safe_ranges[param]
-                    max_display = max(safe_max, current_value)
-                    st.progress(min(current_value / max_display, 1.0))
+                    st.progress(float(progress[i, j]))
 
                     # Show tips if out of range
-                    if not in_safe_range:
+                    if not in_safe_range[i, j]:
                         st.warning(f"Tip: {info['tips']}")
                 else:
                     st.write(f"- **Current Level**: No data available")
 
             # Overall water quality assessment
             st.write("### General Water Safety")
-            if all([safe_ranges["pH"][0] <= row["pH"] <= safe_ranges["pH"][1],
-                    row["Turbidity"] <= safe_ranges["Turbidity"][1],
-                    safe_ranges["Dissolved Oxygen"][0] <= row["Dissolved Oxygen"] <= safe_ranges["Dissolved Oxygen"][1],
-                    row["Nitrate"] <= safe_ranges["Nitrate"][1]]):
+            if all_safe[i]:
                 st.success("✅ All parameters in this area are within safe levels!")
             else:
                 st.error("⚠️ Some parameters are out of range. Please check each above for guidance.")
@@ -0,0 +1,118 @@
+import csv
+import os
+import pandas as pd
+import streamlit as st
+
+# Shared storage for submitted water quality measurements, used by every page
+DATA_PATH = "san_jose_water_quality_user_data.csv"
+DELETIONS_PATH = "san_jose_water_quality_deletions.txt"
+COLUMNS = ["Zipcode", "Date", "pH", "Turbidity", "Dissolved Oxygen", "Nitrate"]
+PARAMS = ["pH", "Turbidity", "Dissolved Oxygen", "Nitrate"]
+# Measurements have small bounded ranges, so float32 halves their memory without losing precision that matters
+QUALITY_DTYPES = {"Zipcode": "category", **{param: "float32" for param in PARAMS}}
+
+def data_available():
+    return os.path.isfile(DATA_PATH) and os.path.getsize(DATA_PATH) > 0
+
+def ensure_data_file():
+    if not os.path.isfile(DATA_PATH):
+        pd.DataFrame(columns=COLUMNS).to_csv(DATA_PATH, index=False)
+
+def append_submission(zipcode, date, ph_level, turbidity, dissolved_oxygen, nitrate):
+    # A single row is written straight to the file; building a DataFrame for it is not needed
+    with open(DATA_PATH, "a", newline="") as f:
+        csv.writer(f, lineterminator="\n").writerow([zipcode, date.isoformat(), ph_level, turbidity, dissolved_oxygen, nitrate])
+
+def data_version():
+    # Changes whenever the data or deletions file is written, so cached results keyed on it are refreshed
+    stat = os.stat(DATA_PATH)
+    version = (stat.st_mtime_ns, stat.st_size)
+    if os.path.isfile(DELETIONS_PATH):
+        deletions_stat = os.stat(DELETIONS_PATH)
+        version += (deletions_stat.st_mtime_ns, deletions_stat.st_size)
+    return version
+
+def deleted_ids():
+    if not os.path.isfile(DELETIONS_PATH):
+        return set()
+    with open(DELETIONS_PATH) as f:
+        return {int(line) for line in f if line.strip()}
+
+def read_options(columns, parse_dates):
+    # Shared by the loader and compact() so both keep and skip the same lines, and row ids agree
+    return dict(
+        usecols=lambda col: col in columns,
+        na_values=["", "NA", "null"],
+        on_bad_lines="skip",  # Row ids stay aligned only because every parse of the file uses these same options
+        parse_dates=["Date"] if parse_dates else False,
+        engine="c",  # The pyarrow engine rejects a callable usecols, which lets missing columns through to the page check
+    )
+
+# Parsed data is cached across reruns and only reloaded when the file changes
+@st.cache_data(show_spinner=False)
+def load_quality(path, version, columns, parse_dates):
+    # Only parse the columns a page actually uses; missing columns are left for the page to report
+    options = read_options(columns, parse_dates)
+    try:
+        data = pd.read_csv(path, dtype=QUALITY_DTYPES, **options)
+    except ValueError:
+        # A hand-edited non-numeric measurement breaks the typed parse; treat such values as NaN instead
+        data = pd.read_csv(path, dtype={"Zipcode": "category"}, **options)
+        for col in PARAMS:
+            if col in data.columns:
+                data[col] = pd.to_numeric(data[col], errors="coerce").astype("float32")
+    # Rows deleted since the last compaction are filtered out here instead of rewriting the file
+    deleted = deleted_ids()
+    if deleted:
+        data = data[~data.index.isin(deleted)]
+    return data
+
+def read_data(columns=None, parse_dates=False):
+    columns = tuple(columns or COLUMNS)
+    return load_quality(DATA_PATH, data_version(), columns, parse_dates)
+
+def data_columns():
+    # Only the header is read, for pages that just need to check the file layout
+    return pd.read_csv(DATA_PATH, nrows=0).columns.tolist()
+
+def load_numeric(path, version, columns=tuple(COLUMNS)):
+    # Drop rows with no measurements at all
+    data = load_quality(path, version, columns, "Date" in columns)
+    return data.dropna(subset=PARAMS, how="all")
+
+def read_numeric(columns=None):
+    return load_numeric(DATA_PATH, data_version(), tuple(columns or COLUMNS))
+
+# Per-zipcode and per-date means, computed once per file version and shared by all pages
+@st.cache_data(show_spinner=False)
+def summarize_quality(path, version, columns):
+    data = load_numeric(path, version, columns)
+    by_zip_mean = data.groupby("Zipcode", observed=True).mean(numeric_only=True).reset_index()
+    # Pages that leave out Date only need the per-zipcode means and skip date parsing
+    by_date_mean = data.groupby("Date")[PARAMS].mean() if "Date" in columns else None
+    return by_zip_mean, by_date_mean
+
+def summarize(columns=None):
+    return summarize_quality(DATA_PATH, data_version(), tuple(columns or COLUMNS))
+
+# Summary statistics are sorted for quantiles, so they are also cached per file version
+@st.cache_data(show_spinner=False)
+def describe_quality(path, version):
+    return load_numeric(path, version).describe()
+
+def describe():
+    return describe_quality(DATA_PATH, data_version())
+
+def delete_row(row_id):
+    # Deleting only records the row id, so it costs one short append regardless of file size
+    with open(DELETIONS_PATH, "a") as f:
+        f.write(f"{row_id}\n")
+
+def compact():
+    # Rewrite the data file without deleted rows and start a fresh deletions file
+    # Values are kept as text so rewritten rows match what was submitted
+    data = pd.read_csv(DATA_PATH, dtype=str, **read_options(tuple(data_columns()), False))
+    data = data[~data.index.isin(deleted_ids())]
+    data.to_csv(DATA_PATH, index=False)
+    if os.path.isfile(DELETIONS_PATH):
+        os.remove(DELETIONS_PATH)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+# Known coordinates for San Jose zip codes, shared by every page
+COORDS = {
+    "95110": (37.3422, -121.8996),
+    "95112": (37.3535, -121.8865),
+    "95113": (37.3333, -121.8907),
+    "95116": (37.3496, -121.8569),
+    "95117": (37.3126, -121.9502),
+    "95118": (37.2505, -121.8891),
+    "95120": (37.2060, -121.8133),
+    # Additional zip codes as needed
+}
+ZIPS = list(COORDS)
+COORDS_ARRAY = np.array(list(COORDS.values()), dtype=np.float32)
+COORDS_FRAME = pd.DataFrame({"Zipcode": ZIPS, "lat": COORDS_ARRAY[:, 0], "lon": COORDS_ARRAY[:, 1]})
+
+# Radians are precomputed once for the vectorized nearest-zipcode lookup
+_LATS = np.radians(COORDS_ARRAY[:, 0])
+_LONS = np.radians(COORDS_ARRAY[:, 1])
+
+EARTH_RADIUS_MILES = 3958.8
+
+def nearest_known(lat, lon):
+    # Haversine term for every zipcode at once; only the nearest one is turned into miles
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    dlat = _LATS - lat_r
+    dlon = _LONS - lon_r
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r) * np.cos(_LATS) * np.sin(dlon / 2) ** 2
+    idx = int(np.argmin(a))
+    miles = 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a[idx]))
+    return ZIPS[idx], float(miles)
+
+def nearest_zipcode(lat, lon):
+    return nearest_known(lat, lon)[0]